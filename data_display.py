@@ -1,137 +1,325 @@
 """
 Data Display System
-Polls MongoDB every 15 seconds and displays changes in the specified format
+Streams new MongoDB documents through a change stream and displays them in the
+specified format, falling back to polling every 15 seconds on standalone servers
 """
-import time
+import asyncio
 import os
+import signal
+import sys
+import time
+import bson
+import orjson
+from bson import ObjectId
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from models.repository_data import RepositoryDataModel
-from database.connection import MongoDBConnection
+from pymongo.errors import OperationFailure, PyMongoError
+from models.repository_data import AsyncRepositoryDataModel
+from database.connection import test_connection, ensure_indexes_once
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Server error codes relevant to change streams
+CHANGE_STREAMS_UNSUPPORTED = 40573  # Standalone server, no oplog to watch
+CHANGE_STREAM_HISTORY_LOST = 286    # Resume token fell off the oplog
+
+# Backoff in seconds before reopening a change stream the driver could not resume
+WATCH_RETRY_INITIAL = 1
+WATCH_RETRY_MAX = 30
+
+# How far behind the newest displayed _id each poll re-reads. The receiver
+# assigns ids before its batched write and ObjectIds are only ordered within
+# one process, so a document can commit with an id below one already shown
+POLL_OVERLAP = timedelta(seconds=5)
+
+# Format for event times in the display output
+DISPLAY_TIME_FORMAT = '%d %b %Y - %H:%M UTC'
+
+def _format_datetime(value):
+    """Format a parsed event time"""
+    return value.strftime(DISPLAY_TIME_FORMAT)
+
+def _format_time_string(value):
+    """Format an ISO 8601 event time string, leaving any other string as is"""
+    if 'T' not in value:
+        return value
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).strftime(DISPLAY_TIME_FORMAT)
+    except ValueError:
+        return value
+
+# Event time formatters by value type; anything else is shown with str()
+_TIME_FORMATTERS = {datetime: _format_datetime, str: _format_time_string}
+
+# Display format for one record, as specified in the requirements
+_RECORD_TEMPLATE = "Author: %s\nPushed to: %s\nOn: %s\nSample: %s\n" + "-" * 40 + "\n"
+
+def _report_display_error(future):
+    """Log a failed render; otherwise the worker pool would drop the exception"""
+    if not future.cancelled() and future.exception() is not None:
+        print(f"Error displaying change: {future.exception()!r}")
+
+class ResumeStore:
+    """
+    Persists the last processed change stream resume token between runs
+    
+    Tokens are written with an atomic rename, but only every `every` events or
+    `interval` seconds, so a crash replays at most that many already-displayed
+    events; it never skips any. Call flush() on shutdown.
+    """
+    def __init__(self, path, every=10, interval=1.0):
+        self.path = path
+        self.every = every
+        self.interval = interval
+        self._token = None
+        self._unsaved = 0
+        self._last_write = time.monotonic()
+    
+    def load(self):
+        """Return the persisted resume token, or None if there is none"""
+        try:
+            with open(self.path, 'rb') as f:
+                for document in bson.decode_file_iter(f):
+                    return document.get('token')
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Ignoring unreadable resume token: {e}")
+        return None
+    
+    def save(self, token):
+        """Record a processed token, writing it out once the batch is due"""
+        self._token = token
+        self._unsaved += 1
+        if self._unsaved >= self.every or time.monotonic() - self._last_write >= self.interval:
+            self.flush()
+    
+    def flush(self):
+        """Write the latest token to disk"""
+        if not self._unsaved:
+            return
+        tmp_path = self.path + '.tmp'
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                f.write(bson.encode({'token': self._token}))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            self._unsaved = 0
+            self._last_write = time.monotonic()
+        except Exception as e:
+            print(f"Error saving resume token: {e}")
+
 class DataDisplaySystem:
     def __init__(self):
-        self.repo_model = RepositoryDataModel()
-        self.last_check_time = datetime.utcnow() - timedelta(seconds=15)  # Start with 15 seconds ago
+        self.repo_model = AsyncRepositoryDataModel()
+        self.last_id = ObjectId.from_datetime(datetime.utcnow() - timedelta(seconds=15))  # Start with 15 seconds ago
+        self._start_id = self.last_id
+        self._shown_ids = set()  # Displayed ids that the overlap window can return again
         self.poll_interval = 15  # seconds
         self.running = False
+        self.resume_store = ResumeStore(os.getenv('RESUME_TOKEN_PATH', os.path.join('data', '.resume_token.bson')))
+        self._resume_token = self.resume_store.load()
+        # Renders change events off the event loop so receiving the next event
+        # never waits on terminal output; one worker keeps events in order
+        self._pool = ThreadPoolExecutor(max_workers=1)
         
-    def format_display_data(self, data_list):
-        """Format data according to the specified display format"""
+    def write_display_data(self, data_list, out=None):
+        """
+        Write data to `out` (stdout by default) in the specified display format
+        
+        Lines are written as they are formatted rather than joined into one
+        string first, so large backlogs never exist twice in memory.
+        """
+        if out is None:
+            out = sys.stdout
         if not data_list:
-            return "No new data to display"
+            out.write("No new data to display\n")
+            return
         
-        output_lines = []
-        output_lines.append("=" * 60)
-        output_lines.append(f"Repository Data Update - {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S UTC')}")
-        output_lines.append("=" * 60)
+        out.write("=" * 60 + "\n")
+        out.write(f"Repository Data Update - {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S UTC')}\n")
+        out.write("=" * 60 + "\n")
         
         for item in data_list:
             # Format according to the specification
             author = item.get('author', 'unknown')
             pushed_to = item.get('pushed_to', 'unknown')
-            on_time = item.get('on', 'unknown')
+            # Prefer the event time parsed at ingest over the raw string
+            on_time = item.get('on_dt') or item.get('on', 'unknown')
             sample = item.get('sample', 'No description')
+            if isinstance(sample, (dict, list)):
+                # Structured payloads are rendered as compact JSON
+                sample = orjson.dumps(sample, default=str).decode()
             
             # Parse the timestamp for better display
-            try:
-                if isinstance(on_time, str):
-                    # Try to parse ISO format timestamp
-                    if 'T' in on_time:
-                        parsed_time = datetime.fromisoformat(on_time.replace('Z', '+00:00'))
-                        formatted_time = parsed_time.strftime('%d %b %Y - %H:%M UTC')
-                    else:
-                        formatted_time = on_time
-                else:
-                    formatted_time = str(on_time)
-            except:
-                formatted_time = str(on_time)
+            formatted_time = _TIME_FORMATTERS.get(type(on_time), str)(on_time)
             
-            # Display format as specified in the requirements
-            output_lines.append(f"Author: {author}")
-            output_lines.append(f"Pushed to: {pushed_to}")
-            output_lines.append(f"On: {formatted_time}")
-            output_lines.append(f"Sample: {sample}")
-            output_lines.append("-" * 40)
-        
-        output_lines.append(f"Total records: {len(data_list)}")
-        output_lines.append("=" * 60)
+            out.write(_RECORD_TEMPLATE % (author, pushed_to, formatted_time, sample))
         
-        return "\n".join(output_lines)
+        out.write(f"Total records: {len(data_list)}\n")
+        out.write("=" * 60 + "\n")
+        out.flush()
     
-    def get_new_data(self):
+    async def get_new_data(self):
         """Get data that has been added since the last check"""
         try:
-            new_data = self.repo_model.get_data_since(self.last_check_time)
-            self.last_check_time = datetime.utcnow()
+            data = await self.repo_model.get_data_since(self._overlap_floor())
+            new_data = [doc for doc in data if doc['_id'] not in self._shown_ids]
+            if new_data:
+                self.last_id = max(self.last_id, new_data[-1]['_id'])
+            # Forget ids that have fallen out of the next poll's window
+            floor = self._overlap_floor()
+            self._shown_ids = {oid for oid in self._shown_ids if oid > floor}
+            self._shown_ids.update(doc['_id'] for doc in new_data)
             return new_data
         except Exception as e:
             print(f"Error fetching new data: {e}")
             return []
     
-    def display_recent_data(self, limit=10):
+    def _overlap_floor(self):
+        """Lower _id bound for the next poll: POLL_OVERLAP before the newest shown id"""
+        floor = ObjectId.from_datetime(self.last_id.generation_time - POLL_OVERLAP)
+        return max(floor, self._start_id)
+    
+    async def display_recent_data(self, limit=10):
         """Display recent data for initial view"""
         try:
-            recent_data = self.repo_model.get_recent_data(limit)
+            recent_data = await self.repo_model.get_recent_data_parallel(limit)
             if recent_data:
-                print(self.format_display_data(recent_data))
+                self.write_display_data(recent_data)
             else:
                 print("No data found in the database")
         except Exception as e:
             print(f"Error displaying recent data: {e}")
     
-    def start_polling(self):
-        """Start the polling loop"""
+    def _display_change(self, change):
+        """Display a change event's document, then record its resume token"""
+        print(f"\n🔔 New data detected at {datetime.utcnow().strftime('%H:%M:%S')}")
+        self.write_display_data([change["fullDocument"]])
+        # Saved only once the event is shown, so a crash with renders still
+        # queued resumes before them rather than after; this runs on the
+        # single render worker, which serializes access to the store
+        self.resume_store.save(change["_id"])
+    
+    async def watch_changes(self):
+        """
+        Display new documents as MongoDB reports them through a change stream
+        
+        The driver resumes once on its own; if that fails too (e.g. the server
+        is unreachable for longer than server selection allows), the stream is
+        reopened from the last token with exponential backoff until stopped.
+        """
+        retry_delay = WATCH_RETRY_INITIAL
+        while self.running:
+            try:
+                async for change in self.repo_model.iter_changes(self._resume_token):
+                    retry_delay = WATCH_RETRY_INITIAL
+                    self._resume_token = change["_id"]
+                    future = self._pool.submit(self._display_change, change)
+                    future.add_done_callback(_report_display_error)
+                    if not self.running:
+                        break
+                return
+            except OperationFailure as e:
+                if e.code == CHANGE_STREAM_HISTORY_LOST and self._resume_token is not None:
+                    print("Resume token is no longer in the oplog, watching from now on")
+                    self._resume_token = None
+                    continue
+                if e.code == CHANGE_STREAMS_UNSUPPORTED:
+                    raise
+                error = e
+            except PyMongoError as e:
+                error = e
+            print(f"Change stream interrupted: {error}; reopening in {retry_delay}s")
+            await asyncio.sleep(retry_delay)
+            retry_delay = min(retry_delay * 2, WATCH_RETRY_MAX)
+    
+    async def poll_changes(self):
+        """Poll for new data every poll interval"""
+        print(f"Polling interval: {self.poll_interval} seconds")
+        deadline = time.monotonic()
+        while self.running:
+            # Schedule from the previous deadline so display time does not accumulate
+            # drift, but never into the past, so a slow poll cannot trigger a burst
+            deadline = max(deadline + self.poll_interval, time.monotonic())
+            
+            # Get new data since last check
+            new_data = await self.get_new_data()
+            
+            if new_data:
+                print(f"\n🔔 New data detected at {datetime.utcnow().strftime('%H:%M:%S')}")
+                self.write_display_data(new_data)
+            else:
+                # Show a heartbeat message every 15 seconds
+                current_time = datetime.utcnow()
+                print(f"⏰ {current_time.strftime('%H:%M:%S')} - Monitoring for changes...")
+
+            # Wait for next poll
+            await asyncio.sleep(max(0, deadline - time.monotonic()))
+    
+    def _install_signal_handlers(self):
+        """Cancel the display task on SIGINT/SIGTERM so shutdown is immediate"""
+        loop = asyncio.get_running_loop()
+        task = asyncio.current_task()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, task.cancel)
+            except (NotImplementedError, RuntimeError):
+                pass  # Not supported on Windows event loops; KeyboardInterrupt still applies
+    
+    async def start_polling(self, install_signal_handlers=True):
+        """
+        Start displaying live changes
+        
+        Pass install_signal_handlers=False when the caller owns signal handling
+        for the event loop, e.g. when running alongside other services.
+        """
         self.running = True
+        if install_signal_handlers:
+            self._install_signal_handlers()
         print(f"Starting data display system...")
-        print(f"Polling interval: {self.poll_interval} seconds")
         print(f"MongoDB URI: {os.getenv('MONGODB_URI', 'mongodb://localhost:27017/')}")
         print("-" * 60)
         
-        # Display initial recent data
-        print("Displaying recent data from database:")
-        self.display_recent_data()
-        
-        print(f"\nStarting live polling (every {self.poll_interval} seconds)...")
-        print("Press Ctrl+C to stop")
-        print("-" * 60)
-        
         try:
-            while self.running:
-                # Get new data since last check
-                new_data = self.get_new_data()
-                
-                if new_data:
-                    print(f"\n🔔 New data detected at {datetime.utcnow().strftime('%H:%M:%S')}")
-                    print(self.format_display_data(new_data))
-                else:
-                    # Show a heartbeat message every 15 seconds
-                    current_time = datetime.utcnow()
-                    print(f"⏰ {current_time.strftime('%H:%M:%S')} - Monitoring for changes...")
-
-                # Wait for next poll
-                time.sleep(self.poll_interval)
+            # Display initial recent data
+            print("Displaying recent data from database:")
+            await self.display_recent_data()
+            
+            print("\nWatching for changes...")
+            print("Press Ctrl+C to stop")
+            print("-" * 60)
+            
+            try:
+                await self.watch_changes()
+            except OperationFailure as e:
+                if e.code != CHANGE_STREAMS_UNSUPPORTED:
+                    raise
+                print("Change streams require a replica set, falling back to polling")
+                await self.poll_changes()
                 
-        except KeyboardInterrupt:
+        except (KeyboardInterrupt, asyncio.CancelledError):
             print("\n\n🛑 Stopping data display system...")
-            self.stop_polling()
+            await self.stop_polling()
         except Exception as e:
             print(f"\n❌ Error in polling loop: {e}")
-            self.stop_polling()
+            await self.stop_polling()
     
-    def stop_polling(self):
+    async def stop_polling(self):
         """Stop the polling loop"""
         self.running = False
-        self.repo_model.close_connection()
+        # Finish queued renders first; they record the tokens being flushed
+        self._pool.shutdown(wait=True)
+        self.resume_store.flush()
         print("Data display system stopped")
 
 def test_database_connection():
     """Test database connection before starting"""
     try:
-        connection = MongoDBConnection()
-        if connection.test_connection():
+        if test_connection():
             print("✅ Database connection successful")
             return True
         else:
@@ -151,11 +339,16 @@ def main():
         print("Please ensure MongoDB is running and accessible")
         return
     
+    # Create indexes unless another service in this process already has
+    ensure_indexes_once()
+    
     # Initialize and start the display system
     display_system = DataDisplaySystem()
     
     try:
-        display_system.start_polling()
+        asyncio.run(display_system.start_polling())
+    except KeyboardInterrupt:
+        pass
     except Exception as e:
         print(f"Failed to start display system: {e}")
 
@@ -2,113 +2,108 @@
 MongoDB connection management and utilities
 """
 import os
+import atexit
+import functools
 from pymongo import MongoClient
 from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError
+from motor.motor_asyncio import AsyncIOMotorClient
 from dotenv import load_dotenv
 import time
 
 load_dotenv()
 
-class MongoDBConnection:
-    _instance = None
-    _client = None
-    
-    def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super(MongoDBConnection, cls).__new__(cls)
-        return cls._instance
-    
-    def __init__(self):
-        if self._client is None:
-            self.connect()
-    
-    def connect(self, max_retries=3, retry_delay=2):
-        """Establish connection to MongoDB with retry logic"""
-        mongodb_uri = os.getenv('MONGODB_URI', 'mongodb://localhost:27017/')
-        
-        for attempt in range(max_retries):
-            try:
-                print(f"Attempting to connect to MongoDB (attempt {attempt + 1}/{max_retries})")
-                self._client = MongoClient(
-                    mongodb_uri,
-                    serverSelectionTimeoutMS=5000,  # 5 second timeout
-                    connectTimeoutMS=5000,
-                    socketTimeoutMS=5000
-                )
-                
-                # Test the connection
-                self._client.admin.command('ping')
-                print("Successfully connected to MongoDB")
-                return True
-                
-            except (ConnectionFailure, ServerSelectionTimeoutError) as e:
-                print(f"Failed to connect to MongoDB: {e}")
-                if attempt < max_retries - 1:
-                    print(f"Retrying in {retry_delay} seconds...")
-                    time.sleep(retry_delay)
-                else:
-                    print("Max retries reached. Could not connect to MongoDB.")
-                    return False
-            except Exception as e:
-                print(f"Unexpected error connecting to MongoDB: {e}")
-                return False
-        
-        return False
-    
-    def get_client(self):
-        """Get MongoDB client instance"""
-        if self._client is None:
-            self.connect()
-        return self._client
-    
-    def get_database(self, db_name=None):
-        """Get database instance"""
-        if db_name is None:
-            db_name = os.getenv('MONGODB_DATABASE', 'github_webhook_db')
-        
-        client = self.get_client()
-        if client:
-            return client[db_name]
-        return None
-    
-    def get_collection(self, collection_name=None, db_name=None):
-        """Get collection instance"""
-        if collection_name is None:
-            collection_name = os.getenv('MONGODB_COLLECTION', 'repository_data')
-        
-        db = self.get_database(db_name)
-        if db is not None:
-            return db[collection_name]
-        return None
+# Set once initialize_database() has created the indexes in this process
+_indexes_initialized = False
+
+def _client_options():
+    """Connection settings shared by the sync and async clients"""
+    # No socketTimeoutMS: change stream getMores legitimately block for up to
+    # MONGODB_CHANGE_STREAM_AWAIT_MS waiting for new events
+    return {
+        'serverSelectionTimeoutMS': 5000,  # 5 second timeout
+        'connectTimeoutMS': 5000
+    }
+
+def _ingest_pool_options():
+    """Pool sizing for the async client that takes the webhook insert bursts"""
+    return {
+        'maxPoolSize': 200,             # Absorb bursts of concurrent webhook deliveries
+        'minPoolSize': 10,              # Keep warm sockets so the first requests skip the handshake
+        'maxIdleTimeMS': 300000,
+        'waitQueueTimeoutMS': 5000,     # Fail fast instead of queueing forever when the pool is exhausted
+    }
+
+@functools.lru_cache(maxsize=1)
+def get_client():
+    """
+    Get the process-wide MongoClient
     
-    def test_connection(self):
-        """Test MongoDB connection"""
+    MongoClient is thread-safe and pools its own sockets, so every model in the
+    process shares this one instance. Connecting is lazy; the first operation
+    waits up to serverSelectionTimeoutMS for a server. The services only ping
+    and create indexes through it, so it keeps the driver's default pool sizing.
+    """
+    return MongoClient(os.getenv('MONGODB_URI', 'mongodb://localhost:27017/'), **_client_options())
+
+@functools.lru_cache(maxsize=1)
+def get_async_client():
+    """Get the process-wide Motor client for code running on an asyncio event loop"""
+    return AsyncIOMotorClient(os.getenv('MONGODB_URI', 'mongodb://localhost:27017/'),
+                              **_client_options(), **_ingest_pool_options())
+
+def get_database(db_name=None):
+    """Get database instance"""
+    if db_name is None:
+        db_name = os.getenv('MONGODB_DATABASE', 'github_webhook_db')
+    return get_client()[db_name]
+
+def get_collection(collection_name=None, db_name=None):
+    """Get collection instance"""
+    if collection_name is None:
+        collection_name = os.getenv('MONGODB_COLLECTION', 'repository_data')
+    return get_database(db_name)[collection_name]
+
+def test_connection(max_retries=3, retry_delay=2):
+    """Test MongoDB connection with retry logic"""
+    for attempt in range(max_retries):
         try:
-            client = self.get_client()
-            if client:
-                client.admin.command('ping')
-                return True
+            print(f"Attempting to connect to MongoDB (attempt {attempt + 1}/{max_retries})")
+            get_client().admin.command('ping')
+            print("Successfully connected to MongoDB")
+            return True
+            
+        except (ConnectionFailure, ServerSelectionTimeoutError) as e:
+            print(f"Failed to connect to MongoDB: {e}")
+            if attempt < max_retries - 1:
+                print(f"Retrying in {retry_delay} seconds...")
+                time.sleep(retry_delay)
+            else:
+                print("Max retries reached. Could not connect to MongoDB.")
         except Exception as e:
-            print(f"Connection test failed: {e}")
-        return False
+            print(f"Unexpected error connecting to MongoDB: {e}")
+            return False
     
-    def close(self):
-        """Close MongoDB connection"""
-        if self._client:
-            self._client.close()
-            self._client = None
-            print("MongoDB connection closed")
+    return False
+
+def close_client():
+    """Close the shared MongoDB clients; the next get_*client() call reconnects"""
+    if get_client.cache_info().currsize:
+        get_client().close()
+        get_client.cache_clear()
+        print("MongoDB connection closed")
+    if get_async_client.cache_info().currsize:
+        get_async_client().close()
+        get_async_client.cache_clear()
+
+# The pooled clients live for the whole process and are closed once at exit
+atexit.register(close_client)
 
 # Database initialization and setup
 def initialize_database():
     """Initialize database with required indexes and collections"""
+    global _indexes_initialized
     try:
-        connection = MongoDBConnection()
-        collection = connection.get_collection()
-        
-        if collection is None:
-            print("Failed to get collection")
-            return False
+        collection = get_collection()
         
         # Create indexes for better performance
         indexes = [
@@ -118,36 +113,42 @@ def initialize_database():
             [("on", -1)],         # For event time queries
         ]
         
+        failed = []
         for index in indexes:
             try:
                 collection.create_index(index)
                 print(f"Created index: {index}")
             except Exception as e:
+                failed.append(index)
                 print(f"Index creation failed for {index}: {e}")
         
         print("Database initialization completed")
+        # Leave the flag unset on partial failure so ensure_indexes_once retries
+        _indexes_initialized = not failed
         return True
         
     except Exception as e:
         print(f"Database initialization failed: {e}")
         return False
 
+def ensure_indexes_once():
+    """Initialize the database unless this process has already done so"""
+    if _indexes_initialized:
+        return True
+    return initialize_database()
+
 def get_database_stats():
     """Get database statistics"""
     try:
-        connection = MongoDBConnection()
-        db = connection.get_database()
-        collection = connection.get_collection()
-        
-        if db is None or collection is None:
-            return None
+        db = get_database()
+        collection = get_collection()
         
         stats = {
             'database_name': db.name,
             'collection_name': collection.name,
             'document_count': collection.count_documents({}),
             'indexes': list(collection.list_indexes()),
-            'connection_status': connection.test_connection()
+            'connection_status': test_connection(max_retries=1)
         }
         
         return stats
@@ -162,8 +163,7 @@ def test_mongodb_setup():
     print("Testing MongoDB setup...")
     
     # Test connection
-    connection = MongoDBConnection()
-    if not connection.test_connection():
+    if not test_connection():
         print("  MongoDB connection failed")
         return False
     print("   MongoDB connection successful")
@@ -1,25 +1,92 @@
 """
 MongoDB model for repository data storage
 """
-from pymongo import MongoClient
+from pymongo.errors import BulkWriteError, OperationFailure
+from pymongo.write_concern import WriteConcern
+import asyncio
 from datetime import datetime
 import os
 from dotenv import load_dotenv
+from database.connection import get_client, get_async_client, close_client
 
 load_dotenv()
 
+# Fields returned by the read paths; anything else stored on a document stays on the server
+RECORD_PROJECTION = {"author": 1, "pushed_to": 1, "on": 1, "on_dt": 1, "sample": 1, "timestamp": 1}
+
+# Index created by initialize_database that serves newest-first reads
+RECENT_INDEX = [("timestamp", -1)]
+
+# Server error code for a hint naming an index that does not exist
+BAD_HINT = 2
+
+def _change_stream_options(collection_name, resume_token, await_ms):
+    """Keyword arguments for collection.watch() shared by the sync and async models"""
+    # Pin the namespace and operation types so the server can discard every
+    # other oplog entry with a cheap predicate check
+    return {
+        'pipeline': [{"$match": {
+            "operationType": {"$in": ["insert", "replace"]},
+            "ns.coll": collection_name
+        }}],
+        'full_document': "updateLookup",
+        'resume_after': resume_token,
+        'max_await_time_ms': int(await_ms)
+    }
+
+def _prepare_document(data):
+    """Fill in derived fields and validate a document before it is written"""
+    # Ensure timestamp is set
+    if 'timestamp' not in data:
+        data['timestamp'] = datetime.utcnow()
+    
+    # Validate required fields
+    required_fields = ['author', 'pushed_to', 'on', 'sample']
+    for field in required_fields:
+        if field not in data:
+            raise ValueError(f"Missing required field: {field}")
+    
+    # Store the event time as a native BSON date so readers skip re-parsing it
+    if 'on_dt' not in data:
+        try:
+            data['on_dt'] = datetime.fromisoformat(data['on'].replace('Z', '+00:00'))
+        except (AttributeError, ValueError):
+            pass
+    return data
+
+def _ingest_view(collection):
+    """Collection view used for writes"""
+    # Webhook events are best effort, so writes are acknowledged by the
+    # primary without waiting for the journal; reads keep the default concern
+    return collection.with_options(write_concern=WriteConcern(w=1, j=False))
+
 class RepositoryDataModel:
+    """
+    Blocking handle on the repository data collection, for scripts and tests
+    that query it directly; the services use AsyncRepositoryDataModel
+    """
     def __init__(self):
-        self.client = MongoClient(os.getenv('MONGODB_URI', 'mongodb://localhost:27017/'))
+        self.client = get_client()
         self.db = self.client[os.getenv('MONGODB_DATABASE', 'github_webhook_db')]
         self.collection = self.db[os.getenv('MONGODB_COLLECTION', 'repository_data')]
-        
-        # Create indexes for better performance
-        self.collection.create_index([("timestamp", -1)])
-        self.collection.create_index([("author", 1)])
-        self.collection.create_index([("pushed_to", 1)])
     
-    def insert_repository_data(self, data):
+    def close_connection(self):
+        """Close the shared MongoDB connection"""
+        close_client()
+
+class AsyncRepositoryDataModel:
+    """
+    asyncio counterpart of RepositoryDataModel backed by Motor, for consumers
+    running on an event loop
+    """
+    def __init__(self):
+        self.client = get_async_client()
+        self.db = self.client[os.getenv('MONGODB_DATABASE', 'github_webhook_db')]
+        self.collection = self.db[os.getenv('MONGODB_COLLECTION', 'repository_data')]
+        self._await_ms = int(os.getenv('MONGODB_CHANGE_STREAM_AWAIT_MS', 10000))
+        self._ingest = _ingest_view(self.collection)
+    
+    async def insert_repository_data(self, data):
         """
         Insert repository data into MongoDB
         
@@ -31,51 +98,122 @@ class RepositoryDataModel:
             "timestamp": datetime,
             "sample": str
         }
+        
+        `on_dt` is added as the parsed datetime of `on` when it is ISO 8601.
         """
         try:
-            # Ensure timestamp is set
-            if 'timestamp' not in data:
-                data['timestamp'] = datetime.utcnow()
-            
-            # Validate required fields
-            required_fields = ['author', 'pushed_to', 'on', 'sample']
-            for field in required_fields:
-                if field not in data:
-                    raise ValueError(f"Missing required field: {field}")
-            
-            result = self.collection.insert_one(data)
+            result = await self._ingest.insert_one(_prepare_document(data))
             return result.inserted_id
         except Exception as e:
             print(f"Error inserting data: {e}")
             return None
     
-    def get_recent_data(self, limit=50):
+    async def insert_repository_data_bulk(self, docs):
+        """
+        Insert several repository data documents in one unordered insert_many
+        
+        Returns the ids of the documents that were stored; a failing document
+        does not prevent the others from being written.
+        """
+        if not docs:
+            return []
+        try:
+            docs = [_prepare_document(doc) for doc in docs]
+            result = await self._ingest.insert_many(docs, ordered=False, bypass_document_validation=False)
+            return result.inserted_ids
+        except BulkWriteError as e:
+            failed = {error['index'] for error in e.details.get('writeErrors', [])}
+            print(f"Error inserting {len(failed)} of {len(docs)} documents: {e}")
+            return [doc['_id'] for index, doc in enumerate(docs) if index not in failed]
+        except Exception as e:
+            print(f"Error inserting data: {e}")
+            return []
+    
+    async def get_recent_data(self, limit=50):
         """
         Get recent repository data sorted by timestamp
         """
+        def recent():
+            return self.collection.find({}, projection=RECORD_PROJECTION).sort("timestamp", -1).limit(limit)
+        
         try:
-            cursor = self.collection.find().sort("timestamp", -1).limit(limit)
-            return list(cursor)
+            try:
+                return await recent().hint(RECENT_INDEX).to_list(length=limit)
+            except OperationFailure as e:
+                if e.code != BAD_HINT:
+                    raise
+                # Index creation failed or has not run yet; a slower read
+                # beats an empty result
+                print(f"Index {RECENT_INDEX} unavailable, reading without the hint: {e}")
+                return await recent().to_list(length=limit)
         except Exception as e:
             print(f"Error fetching data: {e}")
             return []
     
-    def get_data_since(self, since_timestamp):
+    async def get_recent_data_parallel(self, limit=50, workers=8, min_chunk=500):
         """
-        Get data since a specific timestamp
+        Get the `limit` most recently inserted documents, newest first, reading
+        up to `workers` skip/limit chunks of the `_id` index concurrently
+        
+        Chunks are never smaller than `min_chunk` documents, so small snapshots
+        still cost a single query.
+        """
+        try:
+            total = min(limit, await self.collection.estimated_document_count())
+            if not total:
+                return []
+            chunks = min(workers, -(-total // min_chunk))
+            size = -(-total // chunks)
+            
+            async def fetch(skip):
+                cursor = (self.collection.find({}, projection=RECORD_PROJECTION)
+                          .sort("_id", -1).skip(skip).limit(min(size, limit - skip)))
+                return await cursor.to_list(length=size)
+            
+            results = await asyncio.gather(*(fetch(skip) for skip in range(0, total, size)))
+            return [doc for chunk in results for doc in chunk]
+        except Exception as e:
+            print(f"Error fetching data: {e}")
+            return []
+    
+    async def get_data_since(self, last_id):
+        """
+        Get data with an ObjectId greater than `last_id`, oldest first
+        
+        This walks the primary `_id` index. Ids are assigned before the batched
+        write and are only ordered per process, so a document can be committed
+        after one with a higher id; callers that poll should re-read an overlap
+        window rather than resume strictly after the last id they saw.
         """
         try:
             cursor = self.collection.find({
-                "timestamp": {"$gt": since_timestamp}
-            }).sort("timestamp", -1)
-            return list(cursor)
+                "_id": {"$gt": last_id}
+            }, projection=RECORD_PROJECTION).sort("_id", 1)
+            return await cursor.to_list(length=None)
         except Exception as e:
-            print(f"Error fetching data since timestamp: {e}")
+            print(f"Error fetching data since id: {e}")
             return []
     
+    async def iter_changes(self, resume_token=None):
+        """
+        Yield insert and replace events from a change stream on the collection
+        
+        Waits for new documents to be written instead of polling; awaiting the
+        next event parks the coroutine rather than blocking a thread. Pass the
+        `_id` of the last processed change as `resume_token` to replay events
+        that happened while the consumer was down. Requires a replica set.
+        
+        MONGODB_CHANGE_STREAM_AWAIT_MS sets how long each getMore waits on the
+        server for new events. Higher values reduce loopNext CPU on both the
+        client and the server; lower values reduce event delivery delay.
+        """
+        async with self.collection.watch(**_change_stream_options(self.collection.name, resume_token, self._await_ms)) as stream:
+            async for change in stream:
+                yield change
+    
     def close_connection(self):
-        """Close MongoDB connection"""
-        self.client.close()
+        """Close the shared MongoDB connection"""
+        close_client()
 
 # Schema validation function
 def validate_repository_data(data):
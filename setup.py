@@ -3,23 +3,37 @@ Setup and Installation Script
 Installs dependencies and sets up the GitHub webhook MongoDB integration system
 """
 import subprocess
+import shlex
+import shutil
 import sys
 import os
 import platform
 
 def run_command(command, description):
-    """Run a command and handle errors"""
+    """Run a command, streaming its output, and handle errors"""
     print(f" {description}...")
+    args = shlex.split(command)
+    # Resolve the executable so wrappers like npm.cmd are found without a shell
+    args[0] = shutil.which(args[0]) or args[0]
     try:
-        result = subprocess.run(command, shell=True, check=True, 
-                              capture_output=True, text=True)
-        print(f" {description} completed successfully")
-        return True
-    except subprocess.CalledProcessError as e:
+        process = subprocess.Popen(args, stdout=subprocess.PIPE,
+                                   stderr=subprocess.STDOUT, text=True)
+        for line in process.stdout:
+            print(line, end='')
+        process.wait()
+    except OSError as e:
         print(f" {description} failed:")
         print(f"   Command: {command}")
-        print(f"   Error: {e.stderr}")
+        print(f"   Error: {e}")
         return False
+    
+    if process.returncode == 0:
+        print(f" {description} completed successfully")
+        return True
+    print(f" {description} failed:")
+    print(f"   Command: {command}")
+    print(f"   Exit code: {process.returncode}")
+    return False
 
 def check_python_version():
     """Check if Python version is compatible"""
@@ -109,7 +123,7 @@ def test_installation():
     # Test Python imports
     try:
         from models.repository_data import RepositoryDataModel
-        from database.connection import MongoDBConnection
+        from database.connection import get_client
         print("    Python modules import successfully")
     except ImportError as e:
         print(f"    Python module import failed: {e}")
@@ -1,35 +1,59 @@
 """
 System Startup Script
-Starts both the webhook receiver and data display system
+Runs the webhook receiver and data display system together in one process
 """
-import subprocess
-import sys
+import asyncio
 import os
-import time
 import signal
-from multiprocessing import Process
+import uvicorn
 from database.connection import test_mongodb_setup
+from webhook_receiver import app
+from data_display import DataDisplaySystem
 
-def start_webhook_receiver():
-    """Start the webhook receiver"""
+async def run_receiver():
+    """Serve the webhook receiver until cancelled"""
+    port = int(os.getenv('FLASK_PORT', 5000))
+    host = os.getenv('FLASK_HOST', '0.0.0.0')
+    
+    print("Starting webhook receiver...")
+    server = uvicorn.Server(uvicorn.Config(app, host=host, port=port))
+    # Signals are handled by _main for both services
+    server.install_signal_handlers = lambda: None
     try:
-        print("Starting webhook receiver...")
-        os.system("python webhook_receiver.py")
-    except Exception as e:
-        print(f"Error starting webhook receiver: {e}")
+        await server.serve()
+    except asyncio.CancelledError:
+        server.should_exit = True
+        await server.shutdown()
 
-def start_data_display():
-    """Start the data display system"""
-    try:
-        print("Starting data display system...")
-        os.system("python data_display.py")
-    except Exception as e:
-        print(f"Error starting data display system: {e}")
+async def run_display():
+    """Run the data display system until cancelled"""
+    print("Starting data display system...")
+    await DataDisplaySystem().start_polling(install_signal_handlers=False)
 
-def signal_handler(signum, frame):
-    """Handle shutdown signals"""
-    print("\nShutting down system...")
-    sys.exit(0)
+async def _main():
+    """Run both services as tasks on one event loop"""
+    tasks = [
+        asyncio.create_task(run_receiver()),
+        asyncio.create_task(run_display())
+    ]
+    
+    # Set up signal handlers
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, lambda: [task.cancel() for task in tasks])
+        except (NotImplementedError, RuntimeError):
+            pass  # Not supported on Windows event loops; KeyboardInterrupt still applies
+    
+    print("✅ Both systems started successfully")
+    print("📡 Webhook receiver: http://localhost:5000/webhook")
+    print("📊 Data display: Watching MongoDB for changes")
+    print("\nPress Ctrl+C to stop both systems")
+    
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    for result in results:
+        if isinstance(result, Exception):
+            print(f"❌ Error running system: {result}")
 
 def main():
     """Main function to start the complete system"""
@@ -45,39 +69,11 @@ def main():
     print("✅ MongoDB setup successful")
     print("-" * 50)
     
-    # Set up signal handlers
-    signal.signal(signal.SIGINT, signal_handler)
-    signal.signal(signal.SIGTERM, signal_handler)
-    
     try:
-        # Start webhook receiver in a separate process
-        webhook_process = Process(target=start_webhook_receiver)
-        webhook_process.start()
-        
-        # Give webhook receiver time to start
-        time.sleep(2)
-        
-        # Start data display in a separate process
-        display_process = Process(target=start_data_display)
-        display_process.start()
-        
-        print("✅ Both systems started successfully")
-        print("📡 Webhook receiver: http://localhost:5000/webhook")
-        print("📊 Data display: Running with 15-second polling")
-        print("\nPress Ctrl+C to stop both systems")
-        
-        # Wait for processes
-        webhook_process.join()
-        display_process.join()
-        
+        asyncio.run(_main())
     except KeyboardInterrupt:
-        print("\n🛑 Stopping all processes...")
-        if 'webhook_process' in locals():
-            webhook_process.terminate()
-        if 'display_process' in locals():
-            display_process.terminate()
-    except Exception as e:
-        print(f"❌ Error running system: {e}")
+        pass
+    print("\n🛑 All systems stopped")
 
 if __name__ == "__main__":
     main()
@@ -2,19 +2,36 @@
 System Testing Script
 Tests the complete GitHub webhook MongoDB integration workflow
 """
-import requests
+import aiohttp
+import asyncio
 import json
+import orjson
 import time
 import os
+from bson import ObjectId
 from datetime import datetime
 from models.repository_data import RepositoryDataModel
-from database.connection import MongoDBConnection, test_mongodb_setup
+from database.connection import test_connection, test_mongodb_setup
 
 class SystemTester:
     def __init__(self):
         self.webhook_url = "http://localhost:5000"
         self.repo_model = RepositoryDataModel()
         self.test_results = []
+        self.session = None  # aiohttp.ClientSession, open while the tests run
+    
+    def open_session(self):
+        """Open the HTTP session shared by every request the tests send"""
+        # Keep-alive connections are reused across tests; the pool is sized
+        # for the concurrent probes rather than one request at a time
+        connector = aiohttp.TCPConnector(limit=50)
+        self.session = aiohttp.ClientSession(connector=connector)
+        return self.session
+    
+    async def close_session(self):
+        """Close the shared HTTP session"""
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
     
     def log_test(self, test_name, success, message=""):
         """Log test results"""
@@ -33,8 +50,7 @@ class SystemTester:
     def test_database_connection(self):
         """Test MongoDB connection"""
         try:
-            connection = MongoDBConnection()
-            success = connection.test_connection()
+            success = test_connection()
             self.log_test("Database Connection", success, 
                          "Connected to MongoDB" if success else "Failed to connect to MongoDB")
             return success
@@ -42,13 +58,14 @@ class SystemTester:
             self.log_test("Database Connection", False, str(e))
             return False
     
-    def test_webhook_receiver_health(self):
+    async def test_webhook_receiver_health(self):
         """Test webhook receiver health endpoint"""
         try:
-            response = requests.get(f"{self.webhook_url}/health", timeout=5)
-            success = response.status_code == 200
+            async with self.session.get(f"{self.webhook_url}/health",
+                                        timeout=aiohttp.ClientTimeout(total=5)) as response:
+                success = response.status == 200
             self.log_test("Webhook Receiver Health", success, 
-                         f"Status: {response.status_code}" if success else "Health check failed")
+                         f"Status: {response.status}" if success else "Health check failed")
             return success
         except Exception as e:
             self.log_test("Webhook Receiver Health", False, str(e))
@@ -78,6 +95,7 @@ class SystemTester:
     
     def create_test_pr_payload(self):
         """Create a test pull request webhook payload"""
+        now_iso = datetime.utcnow().isoformat() + "Z"
         return {
             "action": "opened",
             "repository": {
@@ -96,33 +114,38 @@ class SystemTester:
                 "head": {
                     "ref": "feature-test"
                 },
-                "created_at": datetime.utcnow().isoformat() + "Z",
-                "updated_at": datetime.utcnow().isoformat() + "Z"
+                "created_at": now_iso,
+                "updated_at": now_iso
             }
         }
     
-    def test_push_webhook(self):
+    async def _send_push_webhook(self):
+        """Post a test push webhook and return the response status and body"""
+        payload = self.create_test_push_payload()
+        headers = {
+            'Content-Type': 'application/json',
+            'X-GitHub-Event': 'push',
+            'X-GitHub-Delivery': 'test-push-' + str(int(time.time()))
+        }
+        
+        async with self.session.post(f"{self.webhook_url}/webhook", json=payload, headers=headers,
+                                     timeout=aiohttp.ClientTimeout(total=10)) as response:
+            return response.status, await response.text()
+    
+    async def test_push_webhook(self):
         """Test push webhook processing"""
         try:
-            payload = self.create_test_push_payload()
-            headers = {
-                'Content-Type': 'application/json',
-                'X-GitHub-Event': 'push',
-                'X-GitHub-Delivery': 'test-push-' + str(int(time.time()))
-            }
-            
-            response = requests.post(f"{self.webhook_url}/webhook", 
-                                   json=payload, headers=headers, timeout=10)
+            status, text = await self._send_push_webhook()
             
-            success = response.status_code == 200
-            message = f"Status: {response.status_code}, Response: {response.text[:100]}"
+            success = status in (200, 202)  # 202: queued for a batched insert
+            message = f"Status: {status}, Response: {text[:100]}"
             self.log_test("Push Webhook Processing", success, message)
             return success
         except Exception as e:
             self.log_test("Push Webhook Processing", False, str(e))
             return False
     
-    def test_pull_request_webhook(self):
+    async def test_pull_request_webhook(self):
         """Test pull request webhook processing"""
         try:
             payload = self.create_test_pr_payload()
@@ -132,63 +155,102 @@ class SystemTester:
                 'X-GitHub-Delivery': 'test-pr-' + str(int(time.time()))
             }
             
-            response = requests.post(f"{self.webhook_url}/webhook", 
-                                   json=payload, headers=headers, timeout=10)
+            async with self.session.post(f"{self.webhook_url}/webhook", json=payload, headers=headers,
+                                         timeout=aiohttp.ClientTimeout(total=10)) as response:
+                text = await response.text()
             
-            success = response.status_code == 200
-            message = f"Status: {response.status_code}, Response: {response.text[:100]}"
+            success = response.status in (200, 202)  # 202: queued for a batched insert
+            message = f"Status: {response.status}, Response: {text[:100]}"
             self.log_test("Pull Request Webhook Processing", success, message)
             return success
         except Exception as e:
             self.log_test("Pull Request Webhook Processing", False, str(e))
             return False
     
-    def test_data_storage(self):
-        """Test data storage in MongoDB"""
+    async def test_burst(self, count=50):
+        """Send `count` push webhooks concurrently and report receiver throughput"""
         try:
-            # Get initial count
-            initial_data = self.repo_model.get_recent_data(1)
-            initial_count = len(initial_data)
+            # Every request carries the same pre-encoded body
+            body = orjson.dumps(self.create_test_push_payload())
+            headers = {
+                'Content-Type': 'application/json',
+                'X-GitHub-Event': 'push'
+            }
+            
+            async def post(index):
+                headers_i = {**headers, 'X-GitHub-Delivery': f'test-burst-{index}'}
+                async with self.session.post(f"{self.webhook_url}/webhook", data=body, headers=headers_i,
+                                             timeout=aiohttp.ClientTimeout(total=10)) as response:
+                    return response.status
             
-            # Send a test webhook
-            self.test_push_webhook()
+            start = time.perf_counter()
+            statuses = await asyncio.gather(*[post(i) for i in range(count)], return_exceptions=True)
+            elapsed = time.perf_counter() - start
             
-            # Wait a moment for processing
-            time.sleep(2)
+            accepted = sum(1 for status in statuses if status in (200, 202))
+            success = accepted == count
+            message = f"{accepted}/{count} accepted in {elapsed:.2f}s ({count / elapsed:.0f} req/s)"
+            self.log_test("Webhook Burst", success, message)
+            return success
+        except Exception as e:
+            self.log_test("Webhook Burst", False, str(e))
+            return False
+    
+    async def _wait_for_record(self, record_id, timeout=3.0, interval=0.05):
+        """Poll MongoDB until the document `record_id` exists; None on timeout"""
+        deadline = time.monotonic() + timeout
+        while True:
+            record = await asyncio.to_thread(self.repo_model.collection.find_one, {'_id': record_id})
+            if record is not None or time.monotonic() >= deadline:
+                return record
+            await asyncio.sleep(interval)
+    
+    async def test_data_storage(self):
+        """Test data storage in MongoDB"""
+        try:
+            # Send a test webhook; the receiver returns the id it will store under
+            status, text = await self._send_push_webhook()
+            if status != 202:
+                self.log_test("Data Storage", False, f"Webhook not accepted, status: {status}")
+                return False
+            record_id = ObjectId(orjson.loads(text)['id'])
             
-            # Check if data was stored
-            new_data = self.repo_model.get_recent_data(5)
-            new_count = len(new_data)
+            # Inserts are batched, so wait for this webhook's own document
+            latest_record = await self._wait_for_record(record_id)
             
-            success = new_count > initial_count
-            message = f"Data count increased from {initial_count} to {new_count}"
+            success = latest_record is not None
+            message = (f"Record {record_id} stored" if success
+                       else f"Record {record_id} not stored within timeout")
             self.log_test("Data Storage", success, message)
             
-            if success and new_data:
+            if success:
                 # Validate data structure
-                latest_record = new_data[0]
                 required_fields = ['author', 'pushed_to', 'on', 'sample']
                 has_all_fields = all(field in latest_record for field in required_fields)
                 self.log_test("Data Structure Validation", has_all_fields,
-                             f"Latest record has all required fields: {list(latest_record.keys())}")
+                             f"Stored record has all required fields: {list(latest_record.keys())}")
             
             return success
+        except asyncio.TimeoutError:
+            self.log_test("Data Storage", False, "Timed out waiting for the webhook receiver")
+            return False
         except Exception as e:
             self.log_test("Data Storage", False, str(e))
             return False
     
-    def test_data_retrieval(self):
+    async def test_data_retrieval(self):
         """Test data retrieval from webhook receiver"""
         try:
-            response = requests.get(f"{self.webhook_url}/recent?limit=5", timeout=5)
-            success = response.status_code == 200
-            
-            if success:
-                data = response.json()
-                count = data.get('count', 0)
-                message = f"Retrieved {count} records successfully"
-            else:
-                message = f"Failed with status {response.status_code}"
+            async with self.session.get(f"{self.webhook_url}/recent?limit=5",
+                                        timeout=aiohttp.ClientTimeout(total=5)) as response:
+                success = response.status == 200
+                
+                if success:
+                    data = await response.json()
+                    count = data.get('count', 0)
+                    message = f"Retrieved {count} records successfully"
+                else:
+                    message = f"Failed with status {response.status}"
             
             self.log_test("Data Retrieval API", success, message)
             return success
@@ -196,32 +258,61 @@ class SystemTester:
             self.log_test("Data Retrieval API", False, str(e))
             return False
     
+    async def _run_test(self, test_name, test_func):
+        """Run one test, sync or async, and return whether it passed"""
+        try:
+            result = test_func()
+            if asyncio.iscoroutine(result):
+                result = await result
+            return bool(result)
+        except Exception as e:
+            self.log_test(test_name, False, f"Test execution error: {e}")
+            return False
+    
     def run_all_tests(self):
         """Run all system tests"""
+        return asyncio.run(self.run_all_tests_async())
+    
+    async def run_all_tests_async(self):
+        """Run all system tests, sending independent HTTP probes concurrently"""
         print("GitHub Webhook MongoDB Integration - System Tests")
         print("=" * 60)
         
-        # Test sequence
-        tests = [
+        # Tests that others depend on run first, one at a time
+        sequential_tests = [
             ("Database Setup", test_mongodb_setup),
             ("Database Connection", self.test_database_connection),
-            ("Webhook Receiver Health", self.test_webhook_receiver_health),
+            ("Webhook Receiver Health", self.test_webhook_receiver_health)
+        ]
+        # Independent requests against the receiver
+        io_tests = [
             ("Push Webhook", self.test_push_webhook),
             ("Pull Request Webhook", self.test_pull_request_webhook),
-            ("Data Storage", self.test_data_storage),
-            ("Data Retrieval", self.test_data_retrieval)
+            ("Data Retrieval", self.test_data_retrieval),
+            ("Webhook Burst", self.test_burst)
+        ]
+        # Waits for its own webhook's record to be stored, so it runs last
+        final_tests = [
+            ("Data Storage", self.test_data_storage)
         ]
         
         passed = 0
-        total = len(tests)
+        total = len(sequential_tests) + len(io_tests) + len(final_tests)
         
-        for test_name, test_func in tests:
-            try:
-                if test_func():
+        self.open_session()
+        try:
+            for test_name, test_func in sequential_tests:
+                if await self._run_test(test_name, test_func):
+                    passed += 1
+            
+            results = await asyncio.gather(*[self._run_test(name, func) for name, func in io_tests])
+            passed += sum(results)
+            
+            for test_name, test_func in final_tests:
+                if await self._run_test(test_name, test_func):
                     passed += 1
-                time.sleep(1)  # Brief pause between tests
-            except Exception as e:
-                self.log_test(test_name, False, f"Test execution error: {e}")
+        finally:
+            await self.close_session()
         
         # Summary
         print("\n" + "=" * 60)
@@ -3,9 +3,60 @@ Implementation Validation Script
 Validates that the implementation meets all requirements from the assessment task
 """
 import os
-import json
-import subprocess
+import re
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import lru_cache
+
+# Needles searched for by the validators, built once at import
+_SCHEMA_FIELDS = frozenset({"author", "pushed_to", "on", "timestamp", "sample"})
+_WEBHOOK_RECEIVER_NEEDLES = frozenset({
+    "push",  # Push event handling
+    "pull_request",  # Pull request event handling
+    "extract_push_data",  # Data extraction functions
+    "extract_pull_request_data",
+    "MongoDB",  # MongoDB integration
+    "FastAPI"  # FastAPI framework
+})
+_DISPLAY_FIELDS = frozenset({"Author:", "Pushed to:", "On:", "Sample:"})
+_WORKFLOW_TRIGGERS = frozenset({"push:", "pull_request:"})
+_README_SECTIONS = frozenset({
+    "Setup",
+    "MongoDB Schema",
+    "GitHub Webhook",
+    "Testing",
+    "API Endpoints"
+})
+
+
+@lru_cache(maxsize=None)
+def _needle_pattern(needles):
+    """Compile one overlapping-match pattern for a frozenset of needles"""
+    # Longest alternatives first, so a match at each position is the longest
+    # needle starting there; shorter needles nested inside it are recovered below
+    alternatives = sorted(needles, key=len, reverse=True)
+    return re.compile("(?=(" + "|".join(map(re.escape, alternatives)) + "))")
+
+
+@lru_cache(maxsize=None)
+def _read(path):
+    """Read a file once; repeated validations reuse the cached content"""
+    with open(path, "r", encoding='utf-8') as f:
+        return f.read()
+
+
+@lru_cache(maxsize=None)
+def _exists(path):
+    """Cached os.path.exists for the fixed set of validated paths"""
+    return os.path.exists(path)
+
+
+def find_missing(content, needles):
+    """Return the needles not present in content, scanning it only once"""
+    needles = frozenset(needles)
+    found = set(_needle_pattern(needles).findall(content))
+    found.update(n for n in needles if any(n in match for match in found))
+    return sorted(needles - found)
 
 class ImplementationValidator:
     def __init__(self):
@@ -36,7 +87,7 @@ class ImplementationValidator:
         
         missing_files = []
         for file_path in required_files:
-            if not os.path.exists(file_path):
+            if not _exists(file_path):
                 missing_files.append(file_path)
         
         success = len(missing_files) == 0
@@ -49,11 +100,9 @@ class ImplementationValidator:
     def validate_mongodb_schema(self):
         """Validate MongoDB schema implementation"""
         try:
-            with open("models/repository_data.py", "r", encoding='utf-8') as f:
-                content = f.read()
+            content = _read("models/repository_data.py")
 
-            required_fields = ["author", "pushed_to", "on", "timestamp", "sample"]
-            schema_valid = all(field in content for field in required_fields)
+            schema_valid = not find_missing(content, _SCHEMA_FIELDS)
 
             self.validation_results["mongodb_schema"] = {
                 "success": schema_valid,
@@ -70,20 +119,10 @@ class ImplementationValidator:
     def validate_webhook_receiver(self):
         """Validate webhook receiver implementation"""
         try:
-            with open("webhook_receiver.py", "r", encoding='utf-8') as f:
-                content = f.read()
+            content = _read("webhook_receiver.py")
 
             # Check for required webhook event handling
-            required_features = [
-                "push",  # Push event handling
-                "pull_request",  # Pull request event handling
-                "extract_push_data",  # Data extraction functions
-                "extract_pull_request_data",
-                "MongoDB",  # MongoDB integration
-                "Flask"  # Flask framework
-            ]
-
-            features_present = all(feature in content for feature in required_features)
+            features_present = not find_missing(content, _WEBHOOK_RECEIVER_NEEDLES)
 
             self.validation_results["webhook_receiver"] = {
                 "success": features_present,
@@ -100,21 +139,13 @@ class ImplementationValidator:
     def validate_data_display(self):
         """Validate data display system"""
         try:
-            with open("data_display.py", "r", encoding='utf-8') as f:
-                content = f.read()
+            content = _read("data_display.py")
 
             # Check for 15-second polling
             polling_implemented = ("poll_interval = 15" in content or "15 seconds" in content) and "poll" in content.lower()
 
             # Check for required display format
-            format_features = [
-                "Author:",
-                "Pushed to:",
-                "On:",
-                "Sample:"
-            ]
-
-            format_valid = all(feature in content for feature in format_features)
+            format_valid = not find_missing(content, _DISPLAY_FIELDS)
 
             success = polling_implemented and format_valid
             message = "Data display system with 15-second polling and correct format"
@@ -140,23 +171,21 @@ class ImplementationValidator:
         try:
             # Check GitHub Actions workflow
             workflow_path = "action-repo/.github/workflows/webhook-trigger.yml"
-            if not os.path.exists(workflow_path):
+            if not _exists(workflow_path):
                 self.validation_results["action_repo"] = {
                     "success": False,
                     "message": "GitHub Actions workflow file missing"
                 }
                 return False
             
-            with open(workflow_path, "r", encoding='utf-8') as f:
-                workflow_content = f.read()
+            workflow_content = _read(workflow_path)
             
             # Check for required workflow triggers
-            required_triggers = ["push:", "pull_request:"]
-            triggers_present = all(trigger in workflow_content for trigger in required_triggers)
+            triggers_present = not find_missing(workflow_content, _WORKFLOW_TRIGGERS)
             
             # Check package.json
             package_path = "action-repo/package.json"
-            package_valid = os.path.exists(package_path)
+            package_valid = _exists(package_path)
             
             success = triggers_present and package_valid
             self.validation_results["action_repo"] = {
@@ -177,7 +206,7 @@ class ImplementationValidator:
         
         missing_tests = []
         for test_file in test_files:
-            if not os.path.exists(test_file):
+            if not _exists(test_file):
                 missing_tests.append(test_file)
         
         success = len(missing_tests) == 0
@@ -190,18 +219,9 @@ class ImplementationValidator:
     def validate_documentation(self):
         """Validate documentation completeness"""
         try:
-            with open("README.md", "r", encoding='utf-8') as f:
-                readme_content = f.read()
-
-            required_sections = [
-                "Setup",
-                "MongoDB Schema",
-                "GitHub Webhook",
-                "Testing",
-                "API Endpoints"
-            ]
+            readme_content = _read("README.md")
 
-            sections_present = all(section in readme_content for section in required_sections)
+            sections_present = not find_missing(readme_content, _README_SECTIONS)
 
             self.validation_results["documentation"] = {
                 "success": sections_present,
@@ -236,9 +256,14 @@ class ImplementationValidator:
         passed = 0
         total = len(validations)
         
-        for validation_name, validation_func in validations:
+        # Validators are independent file reads/scans; run them concurrently
+        # and report in the original order
+        with ThreadPoolExecutor(max_workers=total) as executor:
+            futures = [(name, executor.submit(func)) for name, func in validations]
+        
+        for validation_name, future in futures:
             try:
-                result = validation_func()
+                result = future.result()
                 status = "✅ PASS" if result else "❌ FAIL"
                 message = self.validation_results.get(validation_name.lower().replace(" ", "_"), {}).get("message", "")
                 
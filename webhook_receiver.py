@@ -2,67 +2,153 @@
 GitHub Webhook Receiver
 Handles incoming GitHub webhook events and stores data in MongoDB
 """
-from flask import Flask, request, jsonify
-import json
-import hashlib
+from fastapi import FastAPI, Query, Request
+from fastapi.responses import ORJSONResponse, Response
+from contextlib import asynccontextmanager
+from bson import ObjectId
+import asyncio
+import orjson
+import uvicorn
 import hmac
 import os
 from datetime import datetime
 from dotenv import load_dotenv
-from models.repository_data import RepositoryDataModel, validate_repository_data
+from models.repository_data import AsyncRepositoryDataModel, validate_repository_data
+from database.connection import ensure_indexes_once
 
 load_dotenv()
 
-app = Flask(__name__)
+# Webhook secret, read and encoded once; empty disables signature verification
+_WEBHOOK_SECRET = os.getenv('GITHUB_WEBHOOK_SECRET', '').encode('utf-8')
+
+# Queued documents are written once this many are waiting...
+INSERT_BATCH_SIZE = 100
+# ...or this many seconds after the first of them was queued
+INSERT_FLUSH_INTERVAL = 0.25
+
+# Accepted documents that could not be written are appended here as JSON lines
+DEAD_LETTER_PATH = os.getenv('DEAD_LETTER_PATH', os.path.join('logs', 'dead_letter.jsonl'))
+
+def _json_default(obj):
+    """Encode the BSON types orjson does not handle natively"""
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+class MongoJSONResponse(ORJSONResponse):
+    """ORJSONResponse that also serializes ObjectId, so documents are encoded in one pass"""
+    def render(self, content):
+        return orjson.dumps(content, default=_json_default,
+                            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
 
 # Initialize MongoDB model
-repo_model = RepositoryDataModel()
+repo_model = AsyncRepositoryDataModel()
+
+# Documents waiting for the next batched insert, created with the event loop
+pending_inserts = None
+
+def write_dead_letters(docs):
+    """Append documents that failed to insert to the dead-letter log"""
+    directory = os.path.dirname(DEAD_LETTER_PATH)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(DEAD_LETTER_PATH, 'ab') as f:
+        for doc in docs:
+            f.write(orjson.dumps(doc, default=_json_default, option=orjson.OPT_APPEND_NEWLINE))
+    print(f"Wrote {len(docs)} failed document(s) to {DEAD_LETTER_PATH}")
+
+async def flush_pending_inserts(queue):
+    """Write queued documents with insert_many until a None sentinel arrives"""
+    loop = asyncio.get_running_loop()
+    stopping = False
+    while not stopping:
+        item = await queue.get()
+        if item is None:
+            break
+        batch = [item]
+        deadline = loop.time() + INSERT_FLUSH_INTERVAL
+        while len(batch) < INSERT_BATCH_SIZE:
+            try:
+                item = await asyncio.wait_for(queue.get(), deadline - loop.time())
+            except asyncio.TimeoutError:
+                break
+            if item is None:
+                stopping = True
+                break
+            batch.append(item)
+        # The webhooks were already acknowledged with 202, so documents that
+        # fail to insert are kept in the dead-letter log instead of dropped
+        inserted = set(await repo_model.insert_repository_data_bulk(batch))
+        failed = [doc for doc in batch if doc['_id'] not in inserted]
+        if failed:
+            try:
+                await asyncio.to_thread(write_dead_letters, failed)
+            except OSError as e:
+                print(f"Error writing dead letters: {e}")
+
+@asynccontextmanager
+async def lifespan(app):
+    """Run the batched insert flusher for the lifetime of the server"""
+    global pending_inserts
+    # Done here rather than under __main__ so `uvicorn webhook_receiver:app`
+    # also gets the indexes that /recent hints
+    await asyncio.to_thread(ensure_indexes_once)
+    pending_inserts = asyncio.Queue()
+    flusher = asyncio.create_task(flush_pending_inserts(pending_inserts))
+    yield
+    # Write out everything still queued before shutting down
+    await pending_inserts.put(None)
+    await flusher
+
+app = FastAPI(title="GitHub Webhook Receiver", lifespan=lifespan,
+              default_response_class=MongoJSONResponse)
 
 def verify_signature(payload_body, signature_header):
     """Verify GitHub webhook signature"""
-    secret = os.getenv('GITHUB_WEBHOOK_SECRET', '')
-    if not secret:
+    if not _WEBHOOK_SECRET:
         return True  # Skip verification if no secret is set
 
     if not signature_header:
         return False
     
-    hash_object = hmac.new(
-        secret.encode('utf-8'),
-        payload_body,
-        hashlib.sha256
-    )
-    expected_signature = "sha256=" + hash_object.hexdigest()
+    # One-shot digest runs entirely in OpenSSL, which uses SHA extensions where the CPU has them
+    expected_signature = b"sha256=" + hmac.digest(_WEBHOOK_SECRET, payload_body, 'sha256').hex().encode()
     
-    return hmac.compare_digest(expected_signature, signature_header)
+    return hmac.compare_digest(expected_signature, signature_header.encode())
 
 def extract_push_data(payload):
     """Extract relevant data from GitHub push payload"""
     try:
+        # Look up each nested object once; `or {}` also covers explicit nulls,
+        # e.g. head_commit on branch deletions
+        repo = payload.get('repository') or {}
+        head = payload.get('head_commit') or {}
+        now = datetime.utcnow()
+        
         # Extract author information
-        author = payload.get('pusher', {}).get('name', 'unknown')
+        author = (payload.get('pusher') or {}).get('name')
         if not author or author == 'unknown':
-            author = payload.get('head_commit', {}).get('author', {}).get('name', 'unknown')
+            author = (head.get('author') or {}).get('name') or 'unknown'
         
         # Extract repository and branch information
-        repository = payload.get('repository', {}).get('name', 'unknown')
+        repository = repo.get('name', 'unknown')
         ref = payload.get('ref', 'refs/heads/main')
         branch = ref.split('/')[-1] if ref.startswith('refs/heads/') else ref
         pushed_to = f"{repository}:{branch}"
         
         # Extract timestamp
-        timestamp_str = payload.get('head_commit', {}).get('timestamp')
+        timestamp_str = head.get('timestamp')
         if not timestamp_str:
-            timestamp_str = datetime.utcnow().isoformat() + 'Z'
+            timestamp_str = now.isoformat() + 'Z'
         
         # Extract commit message as sample
-        sample = payload.get('head_commit', {}).get('message', 'No commit message')
+        sample = head.get('message', 'No commit message')
         
         return {
             'author': author,
             'pushed_to': pushed_to,
             'on': timestamp_str,
-            'timestamp': datetime.utcnow(),
+            'timestamp': now,
             'sample': sample
         }
     except Exception as e:
@@ -73,19 +159,20 @@ def extract_pull_request_data(payload):
     """Extract relevant data from GitHub pull request payload"""
     try:
         action = payload.get('action', 'unknown')
-        pr = payload.get('pull_request', {})
+        pr = payload.get('pull_request') or {}
+        repo = payload.get('repository') or {}
+        now = datetime.utcnow()
         
-        author = pr.get('user', {}).get('login', 'unknown')
-        repository = payload.get('repository', {}).get('name', 'unknown')
-        base_branch = pr.get('base', {}).get('ref', 'main')
-        head_branch = pr.get('head', {}).get('ref', 'unknown')
+        author = (pr.get('user') or {}).get('login', 'unknown')
+        repository = repo.get('name', 'unknown')
+        base_branch = (pr.get('base') or {}).get('ref', 'main')
         
         pushed_to = f"{repository}:{base_branch}"
         
         # Use PR creation or update time
         timestamp_str = pr.get('created_at') or pr.get('updated_at')
         if not timestamp_str:
-            timestamp_str = datetime.utcnow().isoformat() + 'Z'
+            timestamp_str = now.isoformat() + 'Z'
         
         sample = f"PR #{pr.get('number', 'unknown')}: {pr.get('title', 'No title')} ({action})"
         
@@ -93,93 +180,103 @@ def extract_pull_request_data(payload):
             'author': author,
             'pushed_to': pushed_to,
             'on': timestamp_str,
-            'timestamp': datetime.utcnow(),
+            'timestamp': now,
             'sample': sample
         }
     except Exception as e:
         print(f"Error extracting pull request data: {e}")
         return None
 
-@app.route('/webhook', methods=['POST'])
-def handle_webhook():
+# Payload extractors for the supported GitHub event types
+EVENT_EXTRACTORS = {
+    'push': extract_push_data,
+    'pull_request': extract_pull_request_data
+}
+
+@app.post('/webhook')
+async def handle_webhook(request: Request):
     """Handle incoming GitHub webhook"""
     try:
         # Verify signature
+        body = await request.body()
         signature = request.headers.get('X-Hub-Signature-256')
-        if not verify_signature(request.data, signature):
-            return jsonify({'error': 'Invalid signature'}), 401
+        if not verify_signature(body, signature):
+            return MongoJSONResponse({'error': 'Invalid signature'}, status_code=401)
         
-        # Get event type
+        # Get event type; other events (ping, status, ...) are acknowledged
+        # without parsing their payload
         event_type = request.headers.get('X-GitHub-Event')
-        payload = request.get_json()
+        extract_data = EVENT_EXTRACTORS.get(event_type)
+        if extract_data is None:
+            print(f"Unsupported event type: {event_type}")
+            return MongoJSONResponse({'message': f'Event type {event_type} not supported'}, status_code=200)
+        
+        try:
+            payload = orjson.loads(body)
+        except orjson.JSONDecodeError:
+            payload = None
         
         if not payload:
-            return jsonify({'error': 'No payload received'}), 400
-        
-        # Process different event types
-        data = None
-        if event_type == 'push':
-            data = extract_push_data(payload)
-        elif event_type == 'pull_request':
-            data = extract_pull_request_data(payload)
-        else:
-            print(f"Unsupported event type: {event_type}")
-            return jsonify({'message': f'Event type {event_type} not supported'}), 200
+            return MongoJSONResponse({'error': 'No payload received'}, status_code=400)
         
+        # Process the event
+        data = extract_data(payload)
         if not data:
-            return jsonify({'error': 'Failed to extract data from payload'}), 400
+            return MongoJSONResponse({'error': 'Failed to extract data from payload'}, status_code=400)
         
         # Validate data
         is_valid, message = validate_repository_data(data)
         if not is_valid:
-            return jsonify({'error': f'Invalid data: {message}'}), 400
-        
-        # Store in MongoDB
-        result_id = repo_model.insert_repository_data(data)
-        if result_id:
-            print(f"Successfully stored data with ID: {result_id}")
-            print(f"Data: {data}")
-            return jsonify({
-                'message': 'Webhook processed successfully',
-                'id': str(result_id),
-                'event_type': event_type
-            }), 200
-        else:
-            return jsonify({'error': 'Failed to store data'}), 500
+            return MongoJSONResponse({'error': f'Invalid data: {message}'}, status_code=400)
+        
+        # Queue for the next batched insert; the id is allocated up front so
+        # it can be returned before the document is written
+        data['_id'] = ObjectId()
+        await pending_inserts.put(data)
+        print(f"Queued data for storage with ID: {data['_id']}")
+        print(f"Data: {data}")
+        return MongoJSONResponse({
+            'message': 'Webhook accepted',
+            'id': data['_id'],
+            'event_type': event_type
+        }, status_code=202)
             
     except Exception as e:
         print(f"Error processing webhook: {e}")
-        return jsonify({'error': 'Internal server error'}), 500
+        return MongoJSONResponse({'error': 'Internal server error'}, status_code=500)
 
-@app.route('/health', methods=['GET'])
-def health_check():
+# The health response has a fixed shape; only the timestamp changes
+_HEALTH_PREFIX = b'{"status":"healthy","timestamp":"'
+_HEALTH_SUFFIX = b'"}'
+
+@app.get('/health')
+async def health_check():
     """Health check endpoint"""
-    return jsonify({'status': 'healthy', 'timestamp': datetime.utcnow().isoformat()}), 200
+    timestamp = datetime.utcnow().isoformat().encode()
+    return Response(_HEALTH_PREFIX + timestamp + _HEALTH_SUFFIX, media_type='application/json')
 
-@app.route('/recent', methods=['GET'])
-def get_recent_data():
-    """Get recent repository data for testing"""
+@app.get('/recent')
+async def get_recent_data(limit: int = Query(10, ge=1)):
+    """Get recent repository data for testing; limit must be a positive integer (422 otherwise)"""
     try:
-        limit = request.args.get('limit', 10, type=int)
-        data = repo_model.get_recent_data(limit)
-        
-        # Convert ObjectId to string for JSON serialization
-        for item in data:
-            item['_id'] = str(item['_id'])
-            if 'timestamp' in item:
-                item['timestamp'] = item['timestamp'].isoformat()
+        data = await repo_model.get_recent_data(limit)
         
-        return jsonify({'data': data, 'count': len(data)}), 200
+        # Returned directly so the documents skip FastAPI's jsonable_encoder;
+        # orjson formats the datetimes and _json_default the ObjectIds
+        return MongoJSONResponse({'data': data, 'count': len(data)})
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return MongoJSONResponse({'error': str(e)}, status_code=500)
 
 if __name__ == '__main__':
     port = int(os.getenv('FLASK_PORT', 5000))
     host = os.getenv('FLASK_HOST', '0.0.0.0')
     debug = os.getenv('FLASK_DEBUG', 'True').lower() == 'true'
+    workers = int(os.getenv('WEBHOOK_WORKERS', 1))
     
     print(f"Starting webhook receiver on {host}:{port}")
     print(f"Webhook endpoint: http://{host}:{port}/webhook")
     print(f"Health check: http://{host}:{port}/health")
     
-    app.run(host=host, port=port, debug=debug)
+    # The loop and HTTP parser default to uvloop and httptools when installed
+    uvicorn.run('webhook_receiver:app', host=host, port=port, workers=workers,
+                log_level='debug' if debug else 'info')